@@ -0,0 +1,206 @@
+"""MovieFlix - CLI unificada do gerador, ETL e analytics.
+
+Uso: python cli.py {generate,clean,emit,load,analyze,bench} [opções]
+
+Cada subcomando importa só o que precisa: pandas é carregado apenas quando
+o engine escolhido exige, então comandos pequenos iniciam em milissegundos.
+"""
+import argparse
+import os
+import sys
+import time
+
+# .env na raiz do projeto, o mesmo lido pelo docker-compose
+DEFAULT_ENV_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', '.env')
+
+
+def _etl(args):
+    from etl_gerador import ETLGenerator
+
+    etl = ETLGenerator(engine=args.engine)
+    etl.data_lake_path = os.path.join(args.data_lake, '')
+    return etl
+
+
+def cmd_generate(args):
+    from gerar_filmes import RealMovieDataGenerator
+
+    generator = RealMovieDataGenerator()
+    generator.get_real_movies_from_api(args.movies)
+    generator.generate_realistic_users(args.users)
+    generator.generate_realistic_ratings(args.ratings)
+    generator.save_to_csv(args.data_lake)
+    if args.analytics:
+        generator.generate_sample_analytics()
+
+
+def cmd_clean(args):
+    etl = _etl(args)
+    engine = etl.resolve_engine()
+    movies, users, ratings = etl.clean_and_transform_records()
+
+    print(f" Engine: {engine}")
+    print(f"    Usuários: {len(users)}")
+    print(f"    Filmes: {len(movies)}")
+    print(f"    Avaliações: {len(ratings)}")
+
+    if args.output:
+        from gerar_filmes import write_csv
+
+        os.makedirs(args.output, exist_ok=True)
+        for name, rows in (('movies', movies), ('users', users), ('ratings', ratings)):
+            write_csv(os.path.join(args.output, f'{name}.csv'), rows)
+        print(f" Dados limpos salvos em: {args.output}")
+
+
+def cmd_emit(args):
+    etl = _etl(args)
+    etl.output_sql_file = args.output
+    etl.generate_sql_file()
+
+
+def _load_env_file(path):
+    """Lê KEY=VALUE do .env sem sobrescrever variáveis já exportadas"""
+    if not os.path.exists(path):
+        return
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith('#') or '=' not in line:
+                continue
+            key, value = line.split('=', 1)
+            value = value.strip().strip('"').strip("'")
+            if value:
+                os.environ.setdefault(key.strip(), value)
+
+
+def cmd_load(args):
+    import subprocess
+
+    if not os.path.exists(args.sql):
+        print(f"❌ Arquivo SQL não encontrado: {args.sql}")
+        return 1
+
+    # Credenciais do .env usado pelo docker-compose (variáveis exportadas têm prioridade)
+    _load_env_file(args.env_file)
+    command = ['mysql', '-h', os.environ.get('DB_HOST') or 'localhost']
+    if os.environ.get('DB_USER'):
+        command += ['-u', os.environ['DB_USER']]
+    if os.environ.get('DB_NAME'):
+        command.append(os.environ['DB_NAME'])
+
+    env = dict(os.environ)
+    if os.environ.get('DB_PASSWORD'):
+        env['MYSQL_PWD'] = os.environ['DB_PASSWORD']
+
+    print(f"📥 Carregando {args.sql} no MySQL...")
+    with open(args.sql, encoding='utf-8') as f:
+        try:
+            result = subprocess.run(command, stdin=f, env=env)
+        except FileNotFoundError:
+            print("❌ Cliente 'mysql' não encontrado no PATH")
+            return 1
+    if result.returncode != 0:
+        print(f"❌ Falha ao carregar {args.sql} (código {result.returncode})")
+    return result.returncode
+
+
+def cmd_analyze(args):
+    from gerar_filmes import RealMovieDataGenerator
+
+    generator = RealMovieDataGenerator()
+    movies_csv = os.path.join(args.data_lake, 'movies.csv')
+    ratings_csv = os.path.join(args.data_lake, 'ratings.csv')
+
+    if args.aproximado:
+        import csv
+
+        # Só os títulos ficam em memória; as avaliações são lidas em chunks
+        with open(movies_csv, newline='', encoding='utf-8') as f:
+            generator.movies_data = [{'id': int(row['id']), 'title': row['title']}
+                                     for row in csv.DictReader(f)]
+        state = None
+        if args.persistir:
+            from sketches import STATE_FILENAME
+            state = os.path.join(args.data_lake, STATE_FILENAME)
+        generator.generate_approximate_analytics(state_path=state,
+                                                 chunk_size=args.chunk_size,
+                                                 ratings_csv=ratings_csv)
+        return
+
+    import pandas as pd
+
+    generator.movies_data = pd.read_csv(movies_csv).to_dict('records')
+    generator.users_data = pd.read_csv(os.path.join(args.data_lake, 'users.csv')).to_dict('records')
+    generator.ratings_data = pd.read_csv(ratings_csv).to_dict('records')
+    generator.generate_sample_analytics()
+
+
+def cmd_bench(args):
+    print("⏱️ Benchmark do ETL (limpeza do Data Lake)")
+    for engine in ('stdlib', 'pandas'):
+        args.engine = engine
+        start = time.perf_counter()
+        try:
+            movies, users, ratings = _etl(args).clean_and_transform_records()
+        except ImportError as exc:
+            print(f"   {engine}: indisponível ({exc})")
+            continue
+        elapsed = (time.perf_counter() - start) * 1000
+        print(f"   {engine}: {elapsed:.1f} ms "
+              f"({len(movies)} filmes, {len(users)} usuários, {len(ratings)} avaliações)")
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="MovieFlix - gerador de dados, ETL e analytics")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    data_lake = argparse.ArgumentParser(add_help=False)
+    data_lake.add_argument('--data-lake', default='data_lake', help="diretório dos CSVs")
+
+    engine = argparse.ArgumentParser(add_help=False)
+    engine.add_argument('--engine', choices=['auto', 'stdlib', 'pandas'], default='auto',
+                        help="auto usa a biblioteca padrão para entradas pequenas")
+
+    generate = subparsers.add_parser('generate', parents=[data_lake], help="gera os CSVs do Data Lake")
+    generate.add_argument('--movies', type=int, default=200)
+    generate.add_argument('--users', type=int, default=450)
+    generate.add_argument('--ratings', type=int, default=3000)
+    generate.add_argument('--analytics', action='store_true', help="mostra o relatório (usa pandas)")
+    generate.set_defaults(func=cmd_generate)
+
+    clean = subparsers.add_parser('clean', parents=[data_lake, engine], help="limpa os dados e mostra estatísticas")
+    clean.add_argument('--output', help="diretório para salvar os CSVs limpos")
+    clean.set_defaults(func=cmd_clean)
+
+    emit = subparsers.add_parser('emit', parents=[data_lake, engine], help="gera o arquivo SQL do ETL")
+    emit.add_argument('--output', default='etl_output.sql')
+    emit.set_defaults(func=cmd_emit)
+
+    load = subparsers.add_parser('load', help="carrega o SQL no MySQL (DB_HOST, DB_USER, DB_PASSWORD, DB_NAME)")
+    load.add_argument('--sql', default='etl_output.sql')
+    load.add_argument('--env-file', default=DEFAULT_ENV_FILE,
+                      help="arquivo .env com as variáveis DB_* (as já exportadas têm prioridade)")
+    load.set_defaults(func=cmd_load)
+
+    analyze = subparsers.add_parser('analyze', parents=[data_lake], help="relatório analítico")
+    analyze.add_argument('--aproximado', action='store_true', help="usa sketches (sem pandas, memória constante)")
+    analyze.add_argument('--persistir', action='store_true',
+                         help="salva os sketches em <data-lake>/analytics_sketches.json e, "
+                              "nas próximas execuções, inclui só avaliações com id novo")
+    analyze.add_argument('--chunk-size', type=int, default=100000)
+    analyze.set_defaults(func=cmd_analyze)
+
+    bench = subparsers.add_parser('bench', parents=[data_lake], help="compara os engines do ETL")
+    bench.set_defaults(func=cmd_bench)
+
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    return args.func(args) or 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,14 +1,53 @@
-import pandas as pd
+import csv
+import math
 import os
 from datetime import datetime
 
+# Até este tamanho total de CSVs o ETL roda só com a biblioteca padrão,
+# sem pagar o custo de importar o pandas em jobs pequenos
+STDLIB_MAX_BYTES = 5 * 1024 * 1024
+
+DATA_LAKE_FILES = ('movies.csv', 'users.csv', 'ratings.csv')
+
+
+def is_missing(value):
+    """Equivalente a pd.isna para valores escalares"""
+    return value is None or (isinstance(value, float) and math.isnan(value))
+
+
+def _to_number(value):
+    """Converte texto do CSV em int/float (None se vazio ou inválido)"""
+    if is_missing(value) or value == '':
+        return None
+    try:
+        return int(value)
+    except ValueError:
+        try:
+            return float(value)
+        except ValueError:
+            return None
+
+
 class ETLGenerator:
-    def __init__(self):
+    def __init__(self, engine='auto'):
         self.data_lake_path = 'data_lake/'
         self.output_sql_file = 'etl_output.sql'
+        self.engine = engine
+    
+    def resolve_engine(self):
+        """Escolhe 'stdlib' ou 'pandas' (em 'auto', pelo tamanho dos CSVs)"""
+        if self.engine != 'auto':
+            return self.engine
+        total = 0
+        for name in DATA_LAKE_FILES:
+            path = f'{self.data_lake_path}{name}'
+            if os.path.exists(path):
+                total += os.path.getsize(path)
+        return 'stdlib' if total <= STDLIB_MAX_BYTES else 'pandas'
         
     def clean_and_transform_data(self):
         """limpa e transforma os dados do Data Lake""" 
+        import pandas as pd
         
         # carrega dados brutos
         movies_df = pd.read_csv(f'{self.data_lake_path}movies.csv')
@@ -22,13 +61,32 @@ class ETLGenerator:
         
         return movies_clean, users_clean, ratings_clean
     
+    def clean_and_transform_records(self):
+        """Dados limpos como listas de dicts, pelo engine escolhido"""
+        if self.resolve_engine() == 'stdlib':
+            movies = self.clean_movies_records(self.read_csv_records('movies.csv'))
+            users = self.clean_users_records(self.read_csv_records('users.csv'))
+            ratings = self.clean_ratings_records(self.read_csv_records('ratings.csv'))
+            return movies, users, ratings
+        
+        movies_clean, users_clean, ratings_clean = self.clean_and_transform_data()
+        return (movies_clean.to_dict('records'),
+                users_clean.to_dict('records'),
+                ratings_clean.to_dict('records'))
+    
+    def read_csv_records(self, name):
+        """Lê um CSV do Data Lake sem pandas (campos vazios viram None)"""
+        with open(f'{self.data_lake_path}{name}', newline='', encoding='utf-8') as f:
+            return [{k: (v if v != '' else None) for k, v in row.items()}
+                    for row in csv.DictReader(f)]
+    
     def clean_movies_data(self, df):
         """Limpa dados de filmes"""
         # Remover filmes sem título
         df = df[df['title'].notna() & (df['title'] != '')]
         
         # Corrigir anos inválidos
-        current_year = pd.Timestamp.now().year
+        current_year = datetime.now().year
         df = df[(df['release_year'] >= 1900) & (df['release_year'] <= current_year)]
         
         # Corrigir durações inválidas
@@ -74,9 +132,63 @@ class ETLGenerator:
         
         return df
     
+    def clean_movies_records(self, rows):
+        """Limpa dados de filmes (mesmas regras de clean_movies_data)"""
+        current_year = datetime.now().year
+        clean = []
+        for row in rows:
+            if not row['title']:
+                continue
+            row['id'] = _to_number(row['id'])
+            row['release_year'] = _to_number(row['release_year'])
+            row['duration'] = _to_number(row['duration'])
+            if row['release_year'] is None or not 1900 <= row['release_year'] <= current_year:
+                continue
+            if row['duration'] is None or row['duration'] <= 0:
+                continue
+            for column in ('genre', 'director', 'country'):
+                if row[column] is None:
+                    row[column] = 'Unknown'
+            clean.append(row)
+        return clean
+    
+    def clean_users_records(self, rows):
+        """Limpa dados de usuários (mesmas regras de clean_users_data)"""
+        clean = []
+        for row in rows:
+            if not row['name']:
+                continue
+            row['id'] = _to_number(row['id'])
+            row['age'] = _to_number(row['age'])
+            if row['age'] is None or not 13 <= row['age'] <= 120:
+                continue
+            if row['country'] is None:
+                row['country'] = 'Unknown'
+            if '@' not in (row['email'] or ''):
+                continue
+            clean.append(row)
+        return clean
+    
+    def clean_ratings_records(self, rows):
+        """Limpa dados de avaliações (mesmas regras de clean_ratings_data)"""
+        valid = []
+        for row in rows:
+            for column in ('id', 'movie_id', 'user_id', 'rating'):
+                row[column] = _to_number(row[column])
+            if row['rating'] is None or not 1 <= row['rating'] <= 5:
+                continue
+            if row['comment'] is None:
+                row['comment'] = ''
+            valid.append(row)
+        
+        # Remover duplicatas (mesmo usuário + mesmo filme), mantendo a última
+        last_index = {(row['user_id'], row['movie_id']): i for i, row in enumerate(valid)}
+        return [row for i, row in enumerate(valid)
+                if last_index[(row['user_id'], row['movie_id'])] == i]
+    
     def escape_sql_string(self, value):
         """Escapa aspas simples para SQL"""
-        if pd.isna(value):
+        if is_missing(value):
             return ''
         return str(value).replace("'", "''")
     
@@ -84,7 +196,7 @@ class ETLGenerator:
         """Gera arquivo SQL com INSERTs dos dados tratados"""
         print("📝 Gerando arquivo SQL...")
         
-        movies_clean, users_clean, ratings_clean = self.clean_and_transform_data()
+        movies_clean, users_clean, ratings_clean = self.clean_and_transform_records()
         
         with open(self.output_sql_file, 'w', encoding='utf-8') as f:
             # Cabeçalho
@@ -100,9 +212,9 @@ class ETLGenerator:
             
             # Inserir usuários
             f.write("--  Inserting users\n")
-            for _, user in users_clean.iterrows():
+            for user in users_clean:
                 created_at = user.get('created_at', 'NOW()')
-                if pd.isna(created_at):
+                if is_missing(created_at):
                     created_at = 'NOW()'
                 elif isinstance(created_at, str) and created_at.strip():
                     created_at = f"'{created_at}'"
@@ -121,9 +233,9 @@ class ETLGenerator:
             
             # Inserir filmes
             f.write("-- 🎬 Inserting movies\n")
-            for _, movie in movies_clean.iterrows():
+            for movie in movies_clean:
                 created_at = movie.get('created_at', 'NOW()')
-                if pd.isna(created_at):
+                if is_missing(created_at):
                     created_at = 'NOW()'
                 elif isinstance(created_at, str) and created_at.strip():
                     created_at = f"'{created_at}'"
@@ -144,9 +256,9 @@ class ETLGenerator:
             
             # Inserir avaliações
             f.write("-- ⭐ Inserting ratings\n")
-            for _, rating in ratings_clean.iterrows():
+            for rating in ratings_clean:
                 created_at = rating.get('created_at', 'NOW()')
-                if pd.isna(created_at):
+                if is_missing(created_at):
                     created_at = 'NOW()'
                 elif isinstance(created_at, str) and created_at.strip():
                     created_at = f"'{created_at}'"
@@ -154,7 +266,7 @@ class ETLGenerator:
                     created_at = 'NOW()'
                 
                 comment = rating.get('comment', '')
-                if pd.isna(comment):
+                if is_missing(comment):
                     comment = ''
                 
                 f.write(f"INSERT INTO ratings (id, movie_id, user_id, rating, comment, created_at) VALUES (")
@@ -1,12 +1,20 @@
-import pandas as pd
-import numpy as np
-import requests
+import argparse
+import csv
+import os
 import random
 from datetime import datetime, timedelta
 import time
-import sqlite3
 from collections import Counter
 
+def write_csv(path, rows):
+    """Escreve uma lista de dicts como CSV (LF, como o pandas no Linux)"""
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        if not rows:
+            return
+        writer = csv.DictWriter(f, fieldnames=list(rows[0].keys()), lineterminator='\n')
+        writer.writeheader()
+        writer.writerows(rows)
+
 class RealMovieDataGenerator:
     def __init__(self):
         self.movies_data = []
@@ -394,18 +402,17 @@ class RealMovieDataGenerator:
             dup_rating['id'] = max(r['id'] for r in self.ratings_data) + 1
             self.ratings_data.append(dup_rating)
     
-    def save_to_csv(self):
+    def save_to_csv(self, data_lake_path='data_lake'):
         """Salva os dados em arquivos CSV"""
         print("Salvando dados nos arquivos CSV...")
         
         # Criar Data Lake directory
-        import os
-        os.makedirs('data_lake', exist_ok=True)
+        os.makedirs(data_lake_path, exist_ok=True)
         
         # Salvar CSVs
-        pd.DataFrame(self.movies_data).to_csv('data_lake/movies.csv', index=False)
-        pd.DataFrame(self.users_data).to_csv('data_lake/users.csv', index=False)
-        pd.DataFrame(self.ratings_data).to_csv('data_lake/ratings.csv', index=False)
+        for name, rows in (('movies', self.movies_data), ('users', self.users_data),
+                           ('ratings', self.ratings_data)):
+            write_csv(os.path.join(data_lake_path, f'{name}.csv'), rows)
         
         print("✅ Dados salvos com sucesso!")
         print(f"🎬 Filmes: {len(self.movies_data)} registros")
@@ -414,6 +421,8 @@ class RealMovieDataGenerator:
     
     def generate_sample_analytics(self):
         """Gera um relatório analítico simples dos dados"""
+        import pandas as pd
+        
         print("\n" + "="*50)
         print("📊 RELATÓRIO ANALÍTICO - DADOS GERADOS")
         print("="*50)
@@ -466,8 +475,88 @@ class RealMovieDataGenerator:
         for _, movie in top_movies_with_titles.iterrows():
             print(f"   {movie['title']}: {movie['avg_rating']}⭐ ({movie['rating_count']} avaliações)")
 
+    def generate_approximate_analytics(self, state_path=None, chunk_size=100000, ratings_csv=None):
+        """Relatório aproximado via sketches (HyperLogLog, Count-Min, t-digest).
+
+        Com state_path, o estado salvo é atualizado incrementalmente: só as
+        avaliações com id acima do último já processado são incluídas. Se a
+        origem mudou (outra primeira avaliação), o estado é recriado.
+        Com ratings_csv, as avaliações são lidas do arquivo em vez de memória
+        (não combinar com ratings_data, senão cada avaliação contaria duas vezes).
+        """
+        from sketches import RatingSketches
+
+        if ratings_csv and self.ratings_data:
+            raise ValueError("Use ratings_csv ou ratings_data, não os dois")
+
+        print("\n" + "="*50)
+        print("📊 RELATÓRIO ANALÍTICO APROXIMADO - SKETCHES")
+        print("="*50)
+
+        saved = None
+        if state_path and os.path.exists(state_path):
+            saved = RatingSketches.load(state_path)
+            if ratings_csv:
+                source = RatingSketches.fingerprint_csv(ratings_csv)
+            else:
+                source = RatingSketches.fingerprint(self.ratings_data[0]) if self.ratings_data else None
+            # Estados sem marca d'água, com outra configuração ou de outra origem
+            # não podem ser atualizados incrementalmente: recriar a partir dos dados
+            if (saved.rows and saved.last_id is None) or not saved.is_compatible(RatingSketches()):
+                print("⚠️ Estado salvo incompatível; recriando os sketches")
+                saved = None
+            elif saved.rows and saved.source != source:
+                print("⚠️ Avaliações de origem mudaram; recriando os sketches")
+                saved = None
+        after_id = saved.last_id if saved else None
+
+        # Processar em chunks só as avaliações ainda não incluídas no estado
+        run_sketches = RatingSketches()
+        if ratings_csv:
+            run_sketches.update_from_csv(ratings_csv, chunk_size, after_id)
+        else:
+            for start in range(0, len(self.ratings_data), chunk_size):
+                run_sketches.update(self.ratings_data[start:start + chunk_size], after_id)
+
+        sketches = saved.merge(run_sketches) if saved else run_sketches
+        if state_path:
+            sketches.save(state_path)
+
+        titles = {m['id']: m['title'] for m in self.movies_data}
+
+        print(f"\n🔢 Contagens Distintas (≈):")
+        print(f"   Avaliações processadas: {sketches.rows} ({run_sketches.rows} novas)")
+        print(f"   Filmes avaliados: ~{sketches.distinct_movies.count()}")
+        print(f"   Usuários ativos: ~{sketches.distinct_users.count()}")
+
+        print(f"\n📅 Usuários Ativos por Mês (≈):")
+        for month in sorted(sketches.monthly_users)[-12:]:
+            print(f"   {month}: ~{sketches.monthly_users[month].count()}")
+
+        print(f"\n⭐ Estatísticas de Avaliação (≈):")
+        digest = sketches.rating_digest
+        if digest.total:
+            print(f"   Média geral: {digest.mean():.2f}")
+            print(f"   Mediana: {digest.quantile(0.5):.2f}")
+            print(f"   P90: {digest.quantile(0.9):.2f}")
+
+        print(f"\n🔥 Top 5 Filmes Mais Avaliados (≈):")
+        for movie_id, count in sketches.top_movies.top(5):
+            print(f"   {titles.get(movie_id, f'Filme {movie_id}')}: ~{count} avaliações")
+
+        print(f"\n🙋 Top 5 Usuários Mais Ativos (≈):")
+        for user_id, count in sketches.top_users.top(5):
+            print(f"   Usuário {user_id}: ~{count} avaliações")
+
+        return sketches
+
 def main():
     """Função principal"""
+    parser = argparse.ArgumentParser(description="MovieFlix Analytics - Gerador de Dados Realistas")
+    parser.add_argument('--aproximado', action='store_true',
+                        help="mostra também o relatório aproximado (sketches)")
+    args = parser.parse_args()
+    
     print("🎬 MovieFlix Analytics - Gerador de Dados Realistas")
     print("="*60)
     
@@ -481,7 +570,10 @@ def main():
     # Salvar e mostrar analytics
     generator.save_to_csv()
     generator.generate_sample_analytics()
-    
+    if args.aproximado:
+        # Dados novos a cada execução: relatório só desta geração, sem estado salvo
+        generator.generate_approximate_analytics(state_path=None)
+
     print("\n✅ Todos os dados foram gerados com sucesso!")
     print("📁 Arquivos salvos em: data_lake/")
     print("\n💡 Próximos passos:")
@@ -0,0 +1,434 @@
+import base64
+import hashlib
+import heapq
+import json
+import math
+import os
+from collections import Counter
+
+# Nome padrão do arquivo de estado dentro do Data Lake
+STATE_FILENAME = 'analytics_sketches.json'
+
+
+def _hash64(value, salt=b''):
+    """Hash estável de 64 bits (não depende do PYTHONHASHSEED)"""
+    digest = hashlib.blake2b(str(value).encode('utf-8'), digest_size=8, salt=salt).digest()
+    return int.from_bytes(digest, 'big')
+
+
+class HyperLogLog:
+    """Contagem aproximada de distintos com memória fixa (2^p registradores)"""
+
+    def __init__(self, p=14):
+        self.p = p
+        self.m = 1 << p
+        self.registers = bytearray(self.m)
+
+    def add(self, value):
+        """Registra um valor"""
+        x = _hash64(value)
+        idx = x >> (64 - self.p)
+        rest = x & ((1 << (64 - self.p)) - 1)
+        rank = (64 - self.p) - rest.bit_length() + 1
+        if rank > self.registers[idx]:
+            self.registers[idx] = rank
+
+    def count(self):
+        """Número estimado de valores distintos"""
+        m = self.m
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / sum(2.0 ** -r for r in self.registers)
+        zeros = self.registers.count(0)
+        # Correção para cardinalidades pequenas (linear counting)
+        if estimate <= 2.5 * m and zeros:
+            estimate = m * math.log(m / zeros)
+        return int(round(estimate))
+
+    def merge(self, other):
+        """Combina com outro HyperLogLog (união dos conjuntos)"""
+        if other.p != self.p:
+            raise ValueError("HyperLogLog com precisões diferentes não podem ser combinados")
+        self.registers = bytearray(max(a, b) for a, b in zip(self.registers, other.registers))
+        return self
+
+    def to_dict(self):
+        """Estado serializável em JSON"""
+        return {'p': self.p, 'registers': base64.b64encode(bytes(self.registers)).decode('ascii')}
+
+    @classmethod
+    def from_dict(cls, data):
+        """Reconstrói a partir de to_dict()"""
+        hll = cls(data['p'])
+        hll.registers = bytearray(base64.b64decode(data['registers']))
+        return hll
+
+
+class HeavyHitters:
+    """Count-Min Sketch com lista de candidatos para os top-k mais frequentes.
+
+    k é a capacidade da lista de candidatos; ela deve ser bem maior que o
+    número de itens consultados em top(), para que itens frequentes que não
+    lideram nenhuma partição sobrevivam ao merge.
+    """
+
+    def __init__(self, k=200, width=8192, depth=4):
+        self.k = k
+        self.width = width
+        self.depth = depth
+        self.table = [[0] * width for _ in range(depth)]
+        self.candidates = {}
+        # Min-heap (estimativa, item) dos candidatos, com invalidação preguiçosa:
+        # entradas antigas ficam no heap até chegarem ao topo
+        self._heap = []
+
+    def _buckets(self, item):
+        h1 = _hash64(item)
+        h2 = _hash64(item, salt=b'cms') | 1
+        return [(h1 + i * h2) % self.width for i in range(self.depth)]
+
+    def estimate(self, item):
+        """Frequência estimada do item (nunca abaixo da real)"""
+        return min(row[b] for row, b in zip(self.table, self._buckets(item)))
+
+    def add(self, item, count=1):
+        """Soma count ocorrências do item (atualização conservadora)"""
+        buckets = self._buckets(item)
+        # Só sobe os contadores abaixo da nova estimativa, o que reduz a
+        # superestimação causada por colisões
+        estimate = min(row[b] for row, b in zip(self.table, buckets)) + count
+        for row, b in zip(self.table, buckets):
+            if row[b] < estimate:
+                row[b] = estimate
+        self._offer(item, estimate)
+
+    def _offer(self, item, estimate):
+        if item in self.candidates or len(self.candidates) < self.k:
+            self._set_candidate(item, estimate)
+            return
+        # O topo do heap nunca passa do menor candidato atual (estimativas só
+        # crescem), então itens que não entrariam na lista saem em O(1)
+        if estimate <= self._heap[0][0]:
+            return
+        while self.candidates.get(self._heap[0][1]) != self._heap[0][0]:
+            heapq.heappop(self._heap)
+            if estimate <= self._heap[0][0]:
+                return
+        _, weakest = heapq.heappop(self._heap)
+        del self.candidates[weakest]
+        self._set_candidate(item, estimate)
+
+    def _set_candidate(self, item, estimate):
+        self.candidates[item] = estimate
+        heapq.heappush(self._heap, (estimate, item))
+        if len(self._heap) > 4 * self.k:
+            self._rebuild_heap()
+
+    def _rebuild_heap(self):
+        self._heap = [(est, item) for item, est in self.candidates.items()]
+        heapq.heapify(self._heap)
+
+    def top(self, n=None):
+        """Lista (item, estimativa) em ordem decrescente de frequência"""
+        ranked = sorted(self.candidates.items(), key=lambda kv: (-kv[1], kv[0]))
+        return ranked[:n] if n else ranked
+
+    def merge(self, other):
+        """Combina com outro HeavyHitters de mesmas dimensões"""
+        if (other.width, other.depth) != (self.width, self.depth):
+            raise ValueError("Count-Min Sketch com dimensões diferentes não podem ser combinados")
+        for row, other_row in zip(self.table, other.table):
+            for i, value in enumerate(other_row):
+                row[i] += value
+        # Reestimar candidatos de ambos os lados com a tabela combinada
+        pool = set(self.candidates) | set(other.candidates)
+        self.candidates = {}
+        self._heap = []
+        for item in sorted(pool, key=lambda it: -self.estimate(it)):
+            self._offer(item, self.estimate(item))
+        return self
+
+    def to_dict(self):
+        """Estado serializável em JSON"""
+        return {
+            'k': self.k, 'width': self.width, 'depth': self.depth,
+            'table': self.table, 'candidates': list(self.candidates.items())
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        """Reconstrói a partir de to_dict()"""
+        hh = cls(data['k'], data['width'], data['depth'])
+        hh.table = data['table']
+        hh.candidates = {item: est for item, est in data['candidates']}
+        hh._rebuild_heap()
+        return hh
+
+
+class TDigest:
+    """t-digest para quantis aproximados com número limitado de centróides"""
+
+    def __init__(self, compression=100):
+        self.compression = compression
+        self.centroids = []
+        self.buffer = []
+        self.total = 0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def add(self, value, weight=1):
+        """Adiciona um valor (com peso) ao digest"""
+        self.buffer.append((float(value), weight))
+        self.total += weight
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+        if len(self.buffer) >= self.compression * 10:
+            self._compress()
+
+    def _compress(self):
+        # Sem pontos novos os centróides já estão compactados; recompactar
+        # mudaria o estado a cada leitura
+        if not self.buffer:
+            return
+        items = sorted(self.centroids + self.buffer)
+        self.buffer = []
+        merged = []
+        cumulative = 0
+        mean, weight = items[0]
+        for next_mean, next_weight in items[1:]:
+            q = (cumulative + weight + next_weight / 2) / self.total
+            limit = 4 * self.total * q * (1 - q) / self.compression
+            if weight + next_weight <= max(limit, 1):
+                weight += next_weight
+                mean += (next_mean - mean) * next_weight / weight
+            else:
+                merged.append((mean, weight))
+                cumulative += weight
+                mean, weight = next_mean, next_weight
+        merged.append((mean, weight))
+        self.centroids = merged
+
+    def quantile(self, q):
+        """Valor aproximado do quantil q (0 a 1)"""
+        self._compress()
+        if not self.centroids:
+            return None
+        target = q * self.total
+        cumulative = 0
+        prev_center, prev_mean = 0, self.min
+        for mean, weight in self.centroids:
+            center = cumulative + weight / 2
+            if target < center:
+                if center == prev_center:
+                    return mean
+                ratio = (target - prev_center) / (center - prev_center)
+                return prev_mean + ratio * (mean - prev_mean)
+            cumulative += weight
+            prev_center, prev_mean = center, mean
+        return self.max
+
+    def mean(self):
+        """Média dos valores adicionados"""
+        self._compress()
+        if not self.total:
+            return None
+        return sum(m * w for m, w in self.centroids) / self.total
+
+    def merge(self, other):
+        """Combina com outro digest"""
+        other._compress()
+        self.buffer.extend(other.centroids)
+        self.total += other.total
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self._compress()
+        return self
+
+    def to_dict(self):
+        """Estado serializável em JSON"""
+        self._compress()
+        return {
+            'compression': self.compression, 'centroids': self.centroids,
+            'total': self.total,
+            'min': self.min if self.total else None,
+            'max': self.max if self.total else None
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        """Reconstrói a partir de to_dict()"""
+        td = cls(data['compression'])
+        td.centroids = [tuple(c) for c in data['centroids']]
+        td.total = data['total']
+        if data['min'] is not None:
+            td.min, td.max = data['min'], data['max']
+        return td
+
+
+class RatingSketches:
+    """Conjunto de sketches das avaliações, combinável entre chunks/partições e persistível"""
+
+    def __init__(self, top_k=200, hll_precision=14, monthly_precision=12):
+        self.top_k = top_k
+        self.hll_precision = hll_precision
+        self.monthly_precision = monthly_precision
+        self.rows = 0
+        # Maior id de avaliação já incluído (marca d'água para cargas incrementais)
+        self.last_id = None
+        # Primeira avaliação da origem (id, created_at): se mudar, os ids
+        # recomeçaram e o estado salvo não vale mais para estes dados
+        self.source = None
+        self.distinct_movies = HyperLogLog(hll_precision)
+        self.distinct_users = HyperLogLog(hll_precision)
+        self.monthly_users = {}
+        self.top_movies = HeavyHitters(top_k)
+        self.top_users = HeavyHitters(top_k)
+        self.rating_digest = TDigest()
+
+    def update(self, ratings, after_id=None):
+        """Processa um chunk de avaliações (dicts com id, movie_id, user_id, rating, created_at).
+
+        Com after_id, avaliações com id <= after_id são ignoradas por já
+        estarem no estado salvo.
+        """
+        movie_counts = Counter()
+        user_counts = Counter()
+        for rating in ratings:
+            if self.source is None:
+                self.source = self.fingerprint(rating)
+            rating_id = rating.get('id')
+            if rating_id not in (None, ''):
+                rating_id = int(rating_id)
+                if after_id is not None and rating_id <= after_id:
+                    continue
+                if self.last_id is None or rating_id > self.last_id:
+                    self.last_id = rating_id
+
+            movie_id = int(rating['movie_id'])
+            user_id = int(rating['user_id'])
+            movie_counts[movie_id] += 1
+            user_counts[user_id] += 1
+            self.rating_digest.add(float(rating['rating']))
+
+            month = str(rating.get('created_at') or '')[:7]
+            if month:
+                if month not in self.monthly_users:
+                    self.monthly_users[month] = HyperLogLog(self.monthly_precision)
+                self.monthly_users[month].add(user_id)
+            self.rows += 1
+
+        # Pré-agregar o chunk reduz as atualizações no Count-Min Sketch
+        for movie_id, count in movie_counts.items():
+            self.distinct_movies.add(movie_id)
+            self.top_movies.add(movie_id, count)
+        for user_id, count in user_counts.items():
+            self.distinct_users.add(user_id)
+            self.top_users.add(user_id, count)
+        return self
+
+    @staticmethod
+    def fingerprint(rating):
+        """Identificação barata da origem a partir da sua primeira avaliação"""
+        return [str(rating.get('id')), str(rating.get('created_at'))]
+
+    @classmethod
+    def fingerprint_csv(cls, path):
+        """fingerprint() da primeira avaliação de um ratings.csv (None se vazio)"""
+        import csv
+
+        with open(path, newline='', encoding='utf-8') as f:
+            for row in csv.DictReader(f):
+                return cls.fingerprint(row)
+        return None
+
+    def update_from_csv(self, path, chunk_size=100000, after_id=None):
+        """Lê um ratings.csv em chunks, mantendo memória constante"""
+        import csv
+
+        with open(path, newline='', encoding='utf-8') as f:
+            chunk = []
+            for row in csv.DictReader(f):
+                if not row.get('rating'):
+                    continue
+                chunk.append(row)
+                if len(chunk) >= chunk_size:
+                    self.update(chunk, after_id)
+                    chunk = []
+            if chunk:
+                self.update(chunk, after_id)
+        return self
+
+    def merge(self, other):
+        """Combina com os sketches de outro chunk/partição (sem sobreposição de linhas)"""
+        self.rows += other.rows
+        if self.source is None:
+            self.source = other.source
+        if other.last_id is not None and (self.last_id is None or other.last_id > self.last_id):
+            self.last_id = other.last_id
+        self.distinct_movies.merge(other.distinct_movies)
+        self.distinct_users.merge(other.distinct_users)
+        for month, hll in other.monthly_users.items():
+            if month in self.monthly_users:
+                self.monthly_users[month].merge(hll)
+            else:
+                self.monthly_users[month] = HyperLogLog.from_dict(hll.to_dict())
+        self.top_movies.merge(other.top_movies)
+        self.top_users.merge(other.top_users)
+        self.rating_digest.merge(other.rating_digest)
+        return self
+
+    def is_compatible(self, other):
+        """Indica se other pode ser combinado com este conjunto de sketches"""
+        return (
+            (self.top_k, self.hll_precision, self.monthly_precision)
+            == (other.top_k, other.hll_precision, other.monthly_precision)
+            and (self.top_movies.width, self.top_movies.depth)
+            == (other.top_movies.width, other.top_movies.depth)
+        )
+
+    def to_dict(self):
+        """Estado serializável em JSON"""
+        return {
+            'top_k': self.top_k,
+            'hll_precision': self.hll_precision,
+            'monthly_precision': self.monthly_precision,
+            'rows': self.rows,
+            'last_id': self.last_id,
+            'source': self.source,
+            'distinct_movies': self.distinct_movies.to_dict(),
+            'distinct_users': self.distinct_users.to_dict(),
+            'monthly_users': {m: hll.to_dict() for m, hll in self.monthly_users.items()},
+            'top_movies': self.top_movies.to_dict(),
+            'top_users': self.top_users.to_dict(),
+            'rating_digest': self.rating_digest.to_dict()
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        """Reconstrói a partir de to_dict()"""
+        sketches = cls(data['top_k'], data['hll_precision'], data['monthly_precision'])
+        sketches.rows = data['rows']
+        sketches.last_id = data.get('last_id')
+        sketches.source = data.get('source')
+        sketches.distinct_movies = HyperLogLog.from_dict(data['distinct_movies'])
+        sketches.distinct_users = HyperLogLog.from_dict(data['distinct_users'])
+        sketches.monthly_users = {m: HyperLogLog.from_dict(d) for m, d in data['monthly_users'].items()}
+        sketches.top_movies = HeavyHitters.from_dict(data['top_movies'])
+        sketches.top_users = HeavyHitters.from_dict(data['top_users'])
+        sketches.rating_digest = TDigest.from_dict(data['rating_digest'])
+        return sketches
+
+    def save(self, path):
+        """Salva o estado em JSON (escrita atômica para não corromper entre execuções)"""
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        """Carrega um estado salvo com save()"""
+        with open(path, encoding='utf-8') as f:
+            return cls.from_dict(json.load(f))
@@ -0,0 +1,104 @@
+import contextlib
+import importlib.util
+import io
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+import cli
+import etl_gerador
+from etl_gerador import ETLGenerator, is_missing
+
+DATA_LAKE = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'datalake')
+HAS_PANDAS = importlib.util.find_spec('pandas') is not None
+
+
+def _normalize(records):
+    """Converte escalares do numpy/NaN para comparar com os dicts da stdlib"""
+    normalized = []
+    for record in records:
+        row = {}
+        for key, value in record.items():
+            if is_missing(value):
+                value = None
+            elif hasattr(value, 'item'):
+                value = value.item()
+            row[key] = value
+        normalized.append(row)
+    return normalized
+
+
+def _etl(engine, data_lake=DATA_LAKE):
+    etl = ETLGenerator(engine=engine)
+    etl.data_lake_path = os.path.join(data_lake, '')
+    return etl
+
+
+class ETLEngineTest(unittest.TestCase):
+    @unittest.skipUnless(HAS_PANDAS, "pandas não instalado")
+    def test_stdlib_matches_pandas_on_bundled_data_lake(self):
+        stdlib = _etl('stdlib').clean_and_transform_records()
+        pandas = _etl('pandas').clean_and_transform_records()
+        for name, ours, theirs in zip(('movies', 'users', 'ratings'), stdlib, pandas):
+            with self.subTest(table=name):
+                self.assertEqual(_normalize(ours), _normalize(theirs))
+
+    def test_resolve_engine_by_data_lake_size(self):
+        total = sum(os.path.getsize(os.path.join(DATA_LAKE, name))
+                    for name in etl_gerador.DATA_LAKE_FILES)
+        with mock.patch.object(etl_gerador, 'STDLIB_MAX_BYTES', total):
+            self.assertEqual(_etl('auto').resolve_engine(), 'stdlib')
+        with mock.patch.object(etl_gerador, 'STDLIB_MAX_BYTES', total - 1):
+            self.assertEqual(_etl('auto').resolve_engine(), 'pandas')
+
+    def test_explicit_engine_is_kept(self):
+        self.assertEqual(_etl('pandas').resolve_engine(), 'pandas')
+        self.assertEqual(_etl('stdlib').resolve_engine(), 'stdlib')
+
+
+class CLISmokeTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp)
+        self.data_lake = os.path.join(self.tmp, 'datalake')
+        shutil.copytree(DATA_LAKE, self.data_lake)
+
+    def _run(self, *argv):
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            code = cli.main(list(argv))
+        self.assertEqual(code, 0)
+        return output.getvalue()
+
+    def test_clean(self):
+        out_dir = os.path.join(self.tmp, 'clean')
+        self._run('clean', '--data-lake', self.data_lake, '--engine', 'stdlib', '--output', out_dir)
+        with open(os.path.join(out_dir, 'ratings.csv'), newline='', encoding='utf-8') as f:
+            content = f.read()
+        self.assertNotIn('\r', content)
+        self.assertEqual(content.count('\n') - 1,
+                         len(_etl('stdlib').clean_and_transform_records()[2]))
+
+    def test_emit(self):
+        sql_file = os.path.join(self.tmp, 'out.sql')
+        self._run('emit', '--data-lake', self.data_lake, '--output', sql_file)
+        with open(sql_file, encoding='utf-8') as f:
+            sql = f.read()
+        self.assertIn('-- Ratings: 2651 inserted', sql)
+        self.assertEqual(sql.count('INSERT INTO ratings'), 2651)
+
+    def test_analyze_aproximado(self):
+        first = self._run('analyze', '--aproximado', '--persistir', '--data-lake', self.data_lake)
+        second = self._run('analyze', '--aproximado', '--persistir', '--data-lake', self.data_lake)
+        self.assertIn('Avaliações processadas: 2692 (2692 novas)', first)
+        self.assertIn('Avaliações processadas: 2692 (0 novas)', second)
+
+    def test_analyze_does_not_persist_by_default(self):
+        self._run('analyze', '--aproximado', '--data-lake', self.data_lake)
+        self.assertFalse(os.path.exists(os.path.join(self.data_lake, 'analytics_sketches.json')))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,154 @@
+import json
+import os
+import random
+import tempfile
+import unittest
+from collections import Counter
+
+from sketches import HeavyHitters, HyperLogLog, RatingSketches, TDigest
+
+
+def _ratings(n, seed=42):
+    """Avaliações sintéticas com alguns filmes/usuários bem mais frequentes"""
+    rng = random.Random(seed)
+    rows = []
+    for rating_id in range(1, n + 1):
+        movie_id = rng.choice([1, 2, 3]) if rng.random() < 0.2 else rng.randint(4, 500)
+        user_id = rng.choice([7, 8]) if rng.random() < 0.1 else rng.randint(9, 2000)
+        rows.append({
+            'id': rating_id,
+            'movie_id': movie_id,
+            'user_id': user_id,
+            'rating': rng.randint(1, 5),
+            'created_at': f"2025-{rng.randint(1, 12):02d}-15 10:00:00"
+        })
+    return rows
+
+
+class HyperLogLogTest(unittest.TestCase):
+    def test_error_within_bounds(self):
+        for n in (100, 5000, 50000):
+            hll = HyperLogLog(14)
+            for i in range(n):
+                hll.add(i)
+            # Erro padrão ~1.04/sqrt(2^14) ≈ 0.8%; 3% é folga de mais de 3 desvios
+            self.assertLess(abs(hll.count() - n) / n, 0.03)
+
+    def test_merge_equals_single_pass(self):
+        whole, left, right = HyperLogLog(), HyperLogLog(), HyperLogLog()
+        for i in range(20000):
+            whole.add(i)
+            (left if i % 2 else right).add(i)
+        self.assertEqual(left.merge(right).registers, whole.registers)
+
+
+class HeavyHittersTest(unittest.TestCase):
+    def test_top_items_on_skewed_data(self):
+        counts = Counter(row['movie_id'] for row in _ratings(20000))
+        hh = HeavyHitters()
+        for item, count in counts.items():
+            hh.add(item, count)
+        self.assertEqual([item for item, _ in hh.top(3)],
+                         [item for item, _ in counts.most_common(3)])
+        for item, estimate in hh.top(3):
+            self.assertGreaterEqual(estimate, counts[item])
+
+
+class TDigestTest(unittest.TestCase):
+    def test_quantiles_on_known_data(self):
+        values = list(range(10000))
+        random.Random(1).shuffle(values)
+        digest = TDigest()
+        for value in values:
+            digest.add(value)
+        for q in (0.01, 0.1, 0.5, 0.9, 0.99):
+            self.assertAlmostEqual(digest.quantile(q), q * 9999, delta=100)
+        self.assertAlmostEqual(digest.mean(), 4999.5, places=6)
+
+    def test_merge_keeps_accuracy(self):
+        left, right = TDigest(), TDigest()
+        for value in range(10000):
+            (left if value % 3 else right).add(value)
+        merged = left.merge(right)
+        self.assertEqual(merged.total, 10000)
+        self.assertAlmostEqual(merged.quantile(0.5), 5000, delta=100)
+
+
+class RatingSketchesTest(unittest.TestCase):
+    def test_partitions_merge_like_single_pass(self):
+        rows = _ratings(20000)
+        whole = RatingSketches().update(rows)
+        merged = RatingSketches()
+        for start in range(0, len(rows), 3000):
+            merged.merge(RatingSketches().update(rows[start:start + 3000]))
+
+        self.assertEqual(merged.rows, whole.rows)
+        self.assertEqual(merged.last_id, whole.last_id)
+        self.assertEqual(merged.distinct_users.count(), whole.distinct_users.count())
+        self.assertEqual(merged.distinct_movies.count(), whole.distinct_movies.count())
+        self.assertEqual(sorted(merged.monthly_users), sorted(whole.monthly_users))
+        self.assertEqual([m for m, _ in merged.top_movies.top(3)], [m for m, _ in whole.top_movies.top(3)])
+        self.assertEqual([u for u, _ in merged.top_users.top(2)], [7, 8])
+        self.assertAlmostEqual(merged.rating_digest.mean(), whole.rating_digest.mean(), places=6)
+
+    def test_to_dict_round_trip(self):
+        sketches = RatingSketches().update(_ratings(2000))
+        data = sketches.to_dict()
+        restored = RatingSketches.from_dict(json.loads(json.dumps(data)))
+        self.assertEqual(restored.to_dict(), data)
+        self.assertEqual(restored.top_users.top(5), sketches.top_users.top(5))
+
+    def test_watermark_skips_processed_ratings(self):
+        rows = _ratings(1000)
+        sketches = RatingSketches().update(rows[:600])
+        delta = RatingSketches().update(rows, after_id=sketches.last_id)
+        self.assertEqual(delta.rows, 400)
+        self.assertEqual(sketches.merge(delta).rows, 1000)
+
+    def test_saved_state_is_not_counted_twice(self):
+        from gerar_filmes import RealMovieDataGenerator
+
+        generator = RealMovieDataGenerator()
+        generator.ratings_data = _ratings(500)
+        with tempfile.TemporaryDirectory() as tmp:
+            state_path = os.path.join(tmp, 'state.json')
+            generator.generate_approximate_analytics(state_path=state_path)
+            sketches = generator.generate_approximate_analytics(state_path=state_path)
+        self.assertEqual(sketches.rows, 500)
+
+    def test_incompatible_saved_state_is_rebuilt(self):
+        from gerar_filmes import RealMovieDataGenerator
+
+        generator = RealMovieDataGenerator()
+        generator.ratings_data = _ratings(500)
+        with tempfile.TemporaryDirectory() as tmp:
+            state_path = os.path.join(tmp, 'state.json')
+            RatingSketches(top_k=20).update(generator.ratings_data).save(state_path)
+            sketches = generator.generate_approximate_analytics(state_path=state_path)
+        self.assertEqual(sketches.rows, 500)
+
+
+    def test_state_from_other_source_is_rebuilt(self):
+        from gerar_filmes import RealMovieDataGenerator
+
+        generator = RealMovieDataGenerator()
+        generator.ratings_data = _ratings(500)
+        with tempfile.TemporaryDirectory() as tmp:
+            state_path = os.path.join(tmp, 'state.json')
+            generator.generate_approximate_analytics(state_path=state_path)
+            # Novo Data Lake: ids recomeçam em 1, mas a origem é outra
+            generator.ratings_data = _ratings(300)
+            generator.ratings_data[0]['created_at'] = '2026-01-01 00:00:00'
+            sketches = generator.generate_approximate_analytics(state_path=state_path)
+        self.assertEqual(sketches.rows, 300)
+    def test_csv_and_memory_sources_are_exclusive(self):
+        from gerar_filmes import RealMovieDataGenerator
+
+        generator = RealMovieDataGenerator()
+        generator.ratings_data = _ratings(10)
+        with self.assertRaises(ValueError):
+            generator.generate_approximate_analytics(ratings_csv='ratings.csv')
+
+
+if __name__ == "__main__":
+    unittest.main()